@@ -0,0 +1,33 @@
+import math
+
+
+class AdaptiveSampler:
+    """
+    Picks the tracking loop's polling interval from gyro activity.
+    After rest_samples consecutive readings below rest_threshold the arm is treated as
+    resting and the loop drops to idle_interval; the first reading above the threshold
+    switches straight back to active_interval, so motion onset costs at most one idle sample.
+    """
+
+    def __init__(self, active_interval=0.5, idle_interval=2.0, rest_threshold=0.1, rest_samples=6):
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.rest_threshold = rest_threshold
+        self.rest_samples = rest_samples
+
+        self.still_count = 0
+        self.idle = False
+
+    def update(self, angular_velocity):
+        """Feeds one gyro reading (x, y, z) and returns how long to sleep before the next poll."""
+        magnitude = math.sqrt(sum(v * v for v in angular_velocity))
+
+        if magnitude >= self.rest_threshold:
+            self.still_count = 0
+            self.idle = False
+        else:
+            self.still_count += 1
+            if self.still_count >= self.rest_samples:
+                self.idle = True
+
+        return self.idle_interval if self.idle else self.active_interval
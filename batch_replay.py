@@ -0,0 +1,225 @@
+import itertools
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from control import (MAX_VELOCITY_THRESHOLD, ROLLING_WINDOW, SLOPE_THRESHOLD, rolling_average,
+                     compute_resistance, slope_command, update_rep_state)
+from event_log import iter_samples, log_base
+
+REPLAY_COLUMNS = ["raw_y", "gyro_y", "rep", "restored"]
+CALIBRATION_FIELDS = ("min_flexion", "max_flexion", "velocity_limit")
+COLUMNAR_SUFFIXES = (".parquet", ".arrow", ".feather")
+
+# A velocity_limit of None replays each session with the limit it was calibrated to live.
+DEFAULT_PARAMS = {
+    "velocity_limit": None,
+    "rolling_window": ROLLING_WINDOW,
+    "slope_threshold": SLOPE_THRESHOLD,
+}
+
+
+def load_sessions(path):
+    """
+    Returns {session_id: {"raw_y", "gyro_y", "rep", "restored": [...], "min_flexion", "max_flexion",
+    "velocity_limit"}} for an event log (.jsonl, read together with its rotated parts) or an exported
+    Parquet/Arrow file, reading only the columns replay needs. min_flexion, max_flexion and
+    velocity_limit are the calibration the live session used (None for logs that predate it).
+    """
+    sessions = defaultdict(lambda: {**{name: [] for name in REPLAY_COLUMNS},
+                                    **{name: None for name in CALIBRATION_FIELDS}})
+
+    if path.endswith(COLUMNAR_SUFFIXES):
+        # Imported here so replaying plain event logs doesn't need pyarrow.
+        from session_export import load_session
+
+        table = load_session(path, columns=["session"] + list(CALIBRATION_FIELDS) + REPLAY_COLUMNS).to_pydict()
+        for i, session in enumerate(table["session"]):
+            columns = sessions[session]
+            for name in REPLAY_COLUMNS:
+                columns[name].append(table[name][i])
+            for name in CALIBRATION_FIELDS:
+                columns[name] = table[name][i]
+    elif log_base(path).endswith(".jsonl"):
+        for session, start, sample in iter_samples(path):
+            columns = sessions[session]
+            columns["raw_y"].append(sample["raw_y"])
+            columns["gyro_y"].append(sample.get("gyro_y"))
+            columns["rep"].append(sample["rep"])
+            columns["restored"].append(sample.get("restored", False))
+            for name in CALIBRATION_FIELDS:
+                columns[name] = start[name]
+    else:
+        raise ValueError(f"Unsupported session file: {path} (expected .jsonl, .parquet or .arrow)")
+
+    return dict(sessions)
+
+
+def replay_session(raw_y, gyro_y, min_flexion, max_flexion, params, restored=None):
+    """
+    Runs one recorded session through the tracking-loop decision logic with the given
+    params and returns its rep count and resistance statistics.
+    Every reading that entered the live filter buffer is in the log, including the warm-up
+    readings and any values restored from a checkpoint (flagged in restored), so with the
+    default params the replayed decisions match the live ones one for one.
+    """
+    restored = restored or [False] * len(raw_y)
+    data_buffer_y = []
+    rep_in_progress = False
+    rep_count = 0
+    resistance_total = 0.0
+    too_fast = 0
+    commands = {"min": 0, "mid": 0, "max": 0}
+    decisions = 0
+
+    for y, velocity, was_restored in zip(raw_y, gyro_y, restored):
+        data_buffer_y.append(y)
+        if was_restored:
+            continue
+        y_avg = rolling_average(data_buffer_y, params["rolling_window"])
+        if y_avg is None:
+            continue
+
+        slope = 0 if len(data_buffer_y) < 2 else data_buffer_y[-1] - data_buffer_y[-2]
+        resistance, _ = compute_resistance(y_avg, velocity, min_flexion, max_flexion, params["velocity_limit"])
+        if abs(velocity) > params["velocity_limit"]:
+            too_fast += 1
+
+        # The slope command is issued last, so it is what the servo actually ends up at.
+        commands[slope_command(slope, params["slope_threshold"])] += 1
+
+        rep_in_progress, rep_completed = update_rep_state(velocity, rep_in_progress)
+        if rep_completed:
+            rep_count += 1
+
+        resistance_total += resistance
+        decisions += 1
+
+    return {
+        "reps": rep_count,
+        "samples": decisions,
+        "mean_resistance": resistance_total / decisions if decisions else 0.0,
+        "too_fast_fraction": too_fast / decisions if decisions else 0.0,
+        "commands": commands,
+    }
+
+
+def replay_file(task):
+    """
+    Worker entry point: loads one session file and replays every session in it against every
+    parameter set in the grid. Returns one list of results (in grid order) per session.
+    """
+    path, grid, labels = task
+    file_results = []
+    for session, columns in load_sessions(path).items():
+        key = f"{os.path.basename(path)}:{session}"
+        # The first row carries the count the session started from (non-zero after a resume).
+        expected_reps = labels.get(key, columns["rep"][-1] - columns["rep"][0] if columns["rep"] else 0)
+
+        raw_y = columns["raw_y"]
+        min_flexion, max_flexion = columns["min_flexion"], columns["max_flexion"]
+        if min_flexion is None or max_flexion is None:
+            # Logs recorded before calibration was logged: the session's own range stands in for it.
+            min_flexion, max_flexion = min(raw_y), max(raw_y)
+            if max_flexion == min_flexion:
+                max_flexion = min_flexion + 1
+        session_limit = columns["velocity_limit"] if columns["velocity_limit"] is not None else MAX_VELOCITY_THRESHOLD
+
+        session_results = []
+        for params in grid:
+            session_params = dict(params)
+            if session_params["velocity_limit"] is None:
+                session_params["velocity_limit"] = session_limit
+            result = replay_session(raw_y, columns["gyro_y"], min_flexion, max_flexion, session_params,
+                                    columns["restored"])
+            result["session"] = key
+            result["params"] = params
+            result["expected_reps"] = expected_reps
+            session_results.append(result)
+        file_results.append(session_results)
+    return file_results
+
+
+def expand_grid(sweep):
+    """Turns {"param": [values, ...]} into a list of full parameter dicts (cartesian product)."""
+    names = list(sweep)
+    grid = []
+    for values in itertools.product(*(sweep[name] for name in names)):
+        params = dict(DEFAULT_PARAMS)
+        params.update(zip(names, values))
+        grid.append(params)
+    return grid
+
+
+def run_batch(paths, sweep=None, labels=None, workers=None):
+    """
+    Replays every session in paths across a process pool, one task per file: each worker
+    decodes its own file, so parsing is spread over the pool and only the small result dicts
+    travel back. Results are aggregated per parameter set. labels maps "<file>:<session>" to
+    the true rep count; sessions without a label are scored against the reps counted live.
+    Returns one summary dict per parameter set, best rep-count error first.
+    """
+    grid = expand_grid(sweep or {name: [value] for name, value in DEFAULT_PARAMS.items()})
+    labels = labels or {}
+
+    # Rotated parts are read with their log, so naming several parts of one log replays it once.
+    paths = list(dict.fromkeys(log_base(path) for path in paths))
+
+    totals = [{"params": params, "sessions": 0, "abs_error": 0, "exact": 0, "samples": 0,
+               "resistance": 0.0, "too_fast": 0.0, "commands": {"min": 0, "mid": 0, "max": 0}} for params in grid]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for file_results in pool.map(replay_file, [(path, grid, labels) for path in paths]):
+            for session_results in file_results:
+                for total, result in zip(totals, session_results):
+                    error = abs(result["reps"] - result["expected_reps"])
+                    total["sessions"] += 1
+                    total["abs_error"] += error
+                    total["exact"] += error == 0
+                    total["samples"] += result["samples"]
+                    total["resistance"] += result["mean_resistance"] * result["samples"]
+                    total["too_fast"] += result["too_fast_fraction"] * result["samples"]
+                    for command, count in result["commands"].items():
+                        total["commands"][command] += count
+
+    summaries = []
+    for total in totals:
+        sessions, samples = total["sessions"] or 1, total["samples"] or 1
+        summaries.append({
+            "params": total["params"],
+            "sessions": total["sessions"],
+            "mean_rep_error": total["abs_error"] / sessions,
+            "exact_rep_rate": total["exact"] / sessions,
+            "mean_resistance": total["resistance"] / samples,
+            "too_fast_fraction": total["too_fast"] / samples,
+            "command_share": {command: count / samples for command, count in total["commands"].items()},
+        })
+
+    summaries.sort(key=lambda summary: summary["mean_rep_error"])
+    return summaries
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python batch_replay.py <session files...> [--sweep sweep.json] [--labels labels.json]")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    sweep = labels = None
+    if "--sweep" in args:
+        i = args.index("--sweep")
+        with open(args[i + 1]) as f:
+            sweep = json.load(f)
+        del args[i:i + 2]
+    if "--labels" in args:
+        i = args.index("--labels")
+        with open(args[i + 1]) as f:
+            labels = json.load(f)
+        del args[i:i + 2]
+
+    for summary in run_batch(args, sweep, labels):
+        print(f"{summary['params']}  sessions={summary['sessions']}  rep_error={summary['mean_rep_error']:.2f}  "
+              f"exact={summary['exact_rep_rate']:.0%}  resistance={summary['mean_resistance']:.2f}  "
+              f"too_fast={summary['too_fast_fraction']:.1%}")
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+
+# Profile fields that identify a patient; weight is left out because it changes between visits.
+KEY_FIELDS = ("name", "age", "gender")
+
+
+class CalibrationCache:
+    """
+    Persistent calibration store keyed by (patient profile, exercise).
+    Entries are kept in least-recently-used order; the cache holds at most max_entries
+    profiles, and a calibration older than max_age seconds is dropped however often it is
+    used, so regular patients are still recalibrated. While tracking, observe() invalidates
+    an entry once live readings stay outside the cached range for too long.
+    """
+
+    def __init__(self, path, max_entries=50, max_age=30 * 24 * 3600, drift_tolerance=0.25, drift_samples=20):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.drift_tolerance = drift_tolerance
+        self.drift_samples = drift_samples
+
+        self._entries = OrderedDict()
+        self._drift_counts = {}
+        self._load()
+
+    @staticmethod
+    def make_key(profile, exercise):
+        fields = (str(profile.get(field, "")).strip().lower() for field in KEY_FIELDS)
+        return "|".join([*fields, exercise])
+
+    def get(self, profile, exercise):
+        """Returns the cached calibration dict for a profile/exercise, or None if missing or stale."""
+        key = self.make_key(profile, exercise)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created_at"] > self.max_age:
+            self.invalidate(profile, exercise)
+            return None
+
+        entry["used_at"] = time.time()
+        self._entries.move_to_end(key)
+        self._save()
+        return entry
+
+    def put(self, profile, exercise, min_flexion, max_flexion, velocity_limit):
+        key = self.make_key(profile, exercise)
+        now = time.time()
+        self._entries[key] = {
+            "min_flexion": min_flexion,
+            "max_flexion": max_flexion,
+            "velocity_limit": velocity_limit,
+            "profile": dict(profile),
+            "created_at": now,
+            "used_at": now,
+        }
+        self._entries.move_to_end(key)
+        self._drift_counts.pop(key, None)
+        self._evict()
+        self._save()
+
+    def invalidate(self, profile, exercise):
+        key = self.make_key(profile, exercise)
+        self._drift_counts.pop(key, None)
+        if self._entries.pop(key, None) is not None:
+            self._save()
+
+    def observe(self, profile, exercise, y_angle):
+        """
+        Checks one live reading against the cached range. Returns True if this reading
+        tipped the entry over the drift limit and it was invalidated.
+        """
+        key = self.make_key(profile, exercise)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+
+        margin = (entry["max_flexion"] - entry["min_flexion"]) * self.drift_tolerance
+        if entry["min_flexion"] - margin <= y_angle <= entry["max_flexion"] + margin:
+            self._drift_counts[key] = 0
+            return False
+
+        self._drift_counts[key] = self._drift_counts.get(key, 0) + 1
+        if self._drift_counts[key] < self.drift_samples:
+            return False
+
+        self.invalidate(profile, exercise)
+        return True
+
+    def _evict(self):
+        cutoff = time.time() - self.max_age
+        for key in [k for k, e in self._entries.items() if e["created_at"] < cutoff]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]["used_at"]):
+            self._entries[key] = entry
+        self._evict()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Calibration cache write failed: {e}")
@@ -0,0 +1,177 @@
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"DP3C"
+VERSION = 3
+
+USER_FIELDS = ("name", "age", "weight", "gender")
+
+# magic, version, saved_at
+_HEADER = struct.Struct("<4sHd")
+# min_flexion, max_flexion, velocity_limit, elapsed, rep_count, rep_in_progress, has_servo_value, servo_value,
+# still_count, idle
+_CORE = struct.Struct("<ddffI??fH?")
+_COUNT = struct.Struct("<B")
+_FLOAT = struct.Struct("<f")
+_STRLEN = struct.Struct("<H")
+_CRC = struct.Struct("<I")
+
+
+def pack_state(state):
+    """
+    Packs session state into a small binary record (typically well under 200 bytes).
+    state keys: min_flexion, max_flexion, velocity_limit, elapsed, rep_count, rep_in_progress,
+    servo_value (None for a detached servo), still_count, idle, filter_buffer (list of floats)
+    and user_info (dict).
+    """
+    buffer = state["filter_buffer"][-255:]
+    servo_value = state["servo_value"]
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, time.time()),
+        _CORE.pack(state["min_flexion"], state["max_flexion"], state["velocity_limit"], state["elapsed"], state["rep_count"],
+                   state["rep_in_progress"], servo_value is not None, servo_value or 0.0,
+                   # still_count grows without bound at rest but only matters up to rest_samples.
+                   min(state["still_count"], 0xFFFF), state["idle"]),
+        _COUNT.pack(len(buffer)),
+        b"".join(_FLOAT.pack(v) for v in buffer),
+    ]
+    user_info = state.get("user_info", {})
+    for field in USER_FIELDS:
+        raw = str(user_info.get(field, "")).encode("utf-8")[:0xFFFF]
+        parts.append(_STRLEN.pack(len(raw)))
+        parts.append(raw)
+
+    body = b"".join(parts)
+    return body + _CRC.pack(zlib.crc32(body))
+
+
+def unpack_state(data):
+    """Reverses pack_state. Returns None if the record is truncated, corrupt or from another version."""
+    if len(data) < _HEADER.size + _CRC.size:
+        return None
+    body, (crc,) = data[:-_CRC.size], _CRC.unpack(data[-_CRC.size:])
+    if zlib.crc32(body) != crc:
+        return None
+
+    magic, version, saved_at = _HEADER.unpack_from(body, 0)
+    if magic != MAGIC or version != VERSION:
+        return None
+    offset = _HEADER.size
+
+    (min_flexion, max_flexion, velocity_limit, elapsed, rep_count, rep_in_progress,
+     has_servo_value, servo_value, still_count, idle) = _CORE.unpack_from(body, offset)
+    offset += _CORE.size
+
+    (count,) = _COUNT.unpack_from(body, offset)
+    offset += _COUNT.size
+    filter_buffer = [_FLOAT.unpack_from(body, offset + i * _FLOAT.size)[0] for i in range(count)]
+    offset += count * _FLOAT.size
+
+    user_info = {}
+    for field in USER_FIELDS:
+        (length,) = _STRLEN.unpack_from(body, offset)
+        offset += _STRLEN.size
+        user_info[field] = body[offset:offset + length].decode("utf-8")
+        offset += length
+
+    return {
+        "saved_at": saved_at,
+        "min_flexion": min_flexion,
+        "max_flexion": max_flexion,
+        "velocity_limit": velocity_limit,
+        "elapsed": elapsed,
+        "rep_count": rep_count,
+        "rep_in_progress": rep_in_progress,
+        "servo_value": servo_value if has_servo_value else None,
+        "still_count": still_count,
+        "idle": idle,
+        "filter_buffer": filter_buffer,
+        "user_info": user_info,
+    }
+
+
+class SessionCheckpointer:
+    """
+    Periodically persists session state so a crashed or killed session can resume
+    without recalibrating. The tracking loop only packs a few bytes; the write, fsync
+    and atomic rename happen on a background thread, and at most one checkpoint per
+    min_interval seconds is written.
+    """
+
+    def __init__(self, path, min_interval=2.0, max_age=1800.0):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_age = max_age
+
+        self._last_save = 0.0
+        self._pending = None
+        self._enabled = True
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="checkpoint", daemon=True)
+        self._worker.start()
+
+    def maybe_save(self, state):
+        """Queues a checkpoint if min_interval has passed since the last one. Returns True if queued."""
+        now = time.monotonic()
+        if now - self._last_save < self.min_interval:
+            return False
+        self._last_save = now
+        self.save(state)
+        return True
+
+    def save(self, state):
+        data = pack_state(state)
+        with self._lock:
+            if not self._enabled:
+                return
+            self._pending = data
+        self._wake.set()
+
+    def load(self):
+        """Returns the last checkpointed state, or None if there is none or it is older than max_age."""
+        try:
+            with open(self.path, "rb") as f:
+                state = unpack_state(f.read())
+        except OSError:
+            return None
+
+        if state is None or time.time() - state["saved_at"] > self.max_age:
+            return None
+        return state
+
+    def clear(self):
+        """Ends the session: deletes the checkpoint and ignores any further saves."""
+        with self._lock:
+            self._enabled = False
+            self._pending = None
+        # Wait out a write already in flight so it cannot recreate the file afterwards.
+        with self._write_lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._write_lock:
+                with self._lock:
+                    data, self._pending = self._pending, None
+                if data is None:
+                    continue
+
+                tmp_path = self.path + ".tmp"
+                try:
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+                except OSError as e:
+                    print(f"⚠️ Checkpoint write failed: {e}")
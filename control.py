@@ -0,0 +1,49 @@
+MAX_VELOCITY_THRESHOLD = 2.5
+ROLLING_WINDOW = 10
+SLOPE_THRESHOLD = 5.0
+REP_START_VELOCITY = 0.5
+REP_END_VELOCITY = 0.1
+
+
+def rolling_average(data_buffer, window=ROLLING_WINDOW):
+    if len(data_buffer) < window:
+        return None
+    return round(sum(data_buffer[-window:]) / len(data_buffer), 2)
+
+
+def compute_resistance(y_avg, angular_velocity, min_flexion, max_flexion, velocity_limit=MAX_VELOCITY_THRESHOLD):
+    """
+    Returns (resistance, servo_command) for one sample, where servo_command is "min", "mid" or "max".
+    Too-fast movement returns (0, "mid"); an unset range returns (0, None).
+    """
+    if min_flexion is None or max_flexion is None:
+        return 0, None
+
+    if abs(angular_velocity) > velocity_limit:
+        return 0, "mid"
+
+    resistance = (y_avg - min_flexion) / (max_flexion - min_flexion)
+    resistance = max(0, min(1, resistance))
+
+    if resistance < 0.3:
+        return resistance, "min"
+    elif resistance > 0.7:
+        return resistance, "max"
+    return resistance, "mid"
+
+
+def slope_command(slope, threshold=SLOPE_THRESHOLD):
+    if slope > threshold:
+        return "max"
+    elif slope < -threshold:
+        return "min"
+    return "mid"
+
+
+def update_rep_state(angular_velocity, rep_in_progress, start_velocity=REP_START_VELOCITY, end_velocity=REP_END_VELOCITY):
+    """Returns (rep_in_progress, rep_completed) after one gyro reading."""
+    if angular_velocity > start_velocity and not rep_in_progress:
+        return True, False
+    elif angular_velocity < end_velocity and rep_in_progress:
+        return False, True
+    return rep_in_progress, False
@@ -0,0 +1,196 @@
+import atexit
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+INFO = "info"
+WARN = "warn"
+
+# Calibration values carried by each "session_start" event.
+SESSION_FIELDS = ("min_flexion", "max_flexion", "velocity_limit", "resumed")
+
+# Rotated parts of an event log are "<path>.1", "<path>.2", ... (oldest first).
+_ROTATED = re.compile(r"^(.*)\.(\d+)$")
+
+_STOP = object()
+
+
+class EventLogger:
+    """
+    Structured event logger that keeps console/file I/O off the tracking loop.
+    The hot path only pushes (template, args) onto a queue; formatting, printing
+    and JSON encoding all happen on a background thread.
+
+    With info_to_file=False, info() lines go to the console only and the JSON file
+    holds warnings and structured events. Once the file passes max_bytes it is renamed
+    to the next free "<path>.N" (nothing is ever deleted), and the latest record of each
+    kind in sticky_events is re-written at the top of the new file so each part stands alone.
+    iter_samples() reads all parts in order, so a session split by rotation stays one session.
+    """
+
+    def __init__(self, jsonl_path=None, console=True, repeat_interval=2.0, max_queue=2048,
+                 info_to_file=True, max_bytes=None, sticky_events=()):
+        self.console = console
+        self.repeat_interval = repeat_interval
+        self.info_to_file = info_to_file
+        self.max_bytes = max_bytes
+        self.sticky_events = sticky_events
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._last_warn = {}  # template -> [last emitted time, suppressed count]
+        self._sticky = {}  # event kind -> last JSON line written
+        self._path = jsonl_path
+        self._file = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+        self._file_bytes = self._file.tell() if self._file is not None else 0
+
+        self._worker = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def info(self, template, *args, **fields):
+        self._push(INFO, template, args, fields, 0)
+
+    def warn(self, template, *args, **fields):
+        """Logs a warning, collapsing repeats of the same template within repeat_interval."""
+        now = time.monotonic()
+        state = self._last_warn.get(template)
+        if state is not None and now - state[0] < self.repeat_interval:
+            state[1] += 1
+            return
+
+        suppressed = state[1] if state is not None else 0
+        self._last_warn[template] = [now, 0]
+        self._push(WARN, template, args, fields, suppressed)
+
+    def event(self, kind, **fields):
+        """Writes a structured record to the JSON log only (never to the console)."""
+        self._push(kind, None, (), fields, 0)
+
+    def close(self):
+        if not self._worker.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._worker.join(timeout=2.0)
+        # If the worker is still draining the queue it owns the file; leave it open.
+        if self._worker.is_alive():
+            return
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _push(self, level, template, args, fields, suppressed):
+        try:
+            self._queue.put_nowait((time.time(), level, template, args, fields, suppressed))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            try:
+                self._write(*item)
+            except Exception as e:
+                print(f"⚠️ Event log error: {e}", file=sys.stderr)
+
+            if self._queue.empty():
+                self._flush()
+        self._flush()
+
+    def _write(self, ts, level, template, args, fields, suppressed):
+        if template is not None and self.console:
+            text = template.format(*args) if args else template
+            if suppressed:
+                text += f" (repeated {suppressed}x)"
+            sys.stdout.write(text + "\n")
+
+        if self._file is not None and (level != INFO or self.info_to_file):
+            record = {"t": round(ts, 3), "level": level}
+            if template is not None:
+                record["msg"] = template
+            if args:
+                record["args"] = args
+            if suppressed:
+                record["suppressed"] = suppressed
+            record.update(fields)
+            line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+            size = len(line.encode("utf-8"))
+            if self.max_bytes is not None and self._file_bytes + size > self.max_bytes:
+                self._rotate()
+            if level in self.sticky_events:
+                self._sticky[level] = line
+            self._file.write(line)
+            self._file_bytes += size
+
+    def _rotate(self):
+        self._file.close()
+        rotated = _rotated_parts(self._path)
+        number = rotated[-1][0] + 1 if rotated else 1
+        os.replace(self._path, f"{self._path}.{number}")
+        self._file = open(self._path, "w", encoding="utf-8")
+        self._file_bytes = 0
+        for line in self._sticky.values():
+            self._file.write(line)
+            self._file_bytes += len(line.encode("utf-8"))
+
+    def _flush(self):
+        if self.console:
+            sys.stdout.flush()
+        if self._file is not None:
+            self._file.flush()
+
+
+def log_base(path):
+    """Maps a rotated part ("session_log.jsonl.3") to its log ("session_log.jsonl"); other paths are unchanged."""
+    match = _ROTATED.match(path)
+    return match.group(1) if match else path
+
+
+def log_parts(jsonl_path):
+    """Returns every file of an event log in write order: its rotated parts, then the live file."""
+    base = log_base(jsonl_path)
+    parts = [path for _, path in _rotated_parts(base)]
+    if os.path.exists(base):
+        parts.append(base)
+    return parts
+
+
+def iter_samples(jsonl_path):
+    """
+    Yields (session, start, sample) from an event log and all of its rotated parts, oldest first.
+    session is the session_start time in ms and start holds that session's SESSION_FIELDS
+    (None if the log has no session_start). A session that spans a rotation keeps the same
+    id in every part, so its samples come out as one uninterrupted session.
+    """
+    session = 0
+    start = {name: None for name in SESSION_FIELDS}
+    for path in log_parts(jsonl_path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                level = record.get("level")
+                if level == "session_start":
+                    session = int(record["t"] * 1000)
+                    start = {name: record.get(name) for name in SESSION_FIELDS}
+                elif level == "sample":
+                    yield session, start, record
+
+
+def _rotated_parts(base):
+    """Returns [(number, path), ...] for the rotated parts of base, lowest number first."""
+    directory = os.path.dirname(base) or "."
+    prefix = os.path.basename(base) + "."
+    parts = []
+    for name in os.listdir(directory):
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and suffix.isdigit():
+            parts.append((int(suffix), os.path.join(os.path.dirname(base), name)))
+    return sorted(parts)
@@ -5,57 +5,84 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from gpiozero import Servo, Buzzer
 from sensor_library import *
-
-MAX_VELOCITY_THRESHOLD = 2.5  
-ROLLING_WINDOW = 10  
+from event_log import EventLogger
+from adaptive_sampling import AdaptiveSampler
+from checkpoint import SessionCheckpointer
+from calibration_cache import CalibrationCache
+from safety import SafetyInterlock, GatedServo
+from spectral import SpectralAnalyzer
+from control import (MAX_VELOCITY_THRESHOLD, REP_START_VELOCITY, ROLLING_WINDOW, SLOPE_THRESHOLD, rolling_average,
+                     compute_resistance, slope_command, update_rep_state)
+
+MIN_VELOCITY_THRESHOLD = 1.0
+VELOCITY_MARGIN = 2.0
+MAX_ACCEL_THRESHOLD = 15.0
+SAFETY_INTERVAL = 0.005
+SAFETY_IDLE_INTERVAL = 0.05
+SAMPLE_INTERVAL = 0.5
+IDLE_SAMPLE_INTERVAL = 2.0
+CHECKPOINT_INTERVAL = 2.0
+EXERCISE = "bicep_curl"
+LOG_MAX_BYTES = 20 * 1024 * 1024
 
 servo = Servo(8)
 buzzer = Buzzer(6)
 buzzer.off()
 sensor = Orientation_Sensor()
-
-def rolling_average(data_buffer):
-    if len(data_buffer) < ROLLING_WINDOW:
-        return None  
-    return round(sum(data_buffer[-ROLLING_WINDOW:]) / len(data_buffer), 2)
+log = EventLogger(jsonl_path="session_log.jsonl", info_to_file=False, max_bytes=LOG_MAX_BYTES,
+                  sticky_events=("session_start",))
+checkpointer = SessionCheckpointer("session.ckpt", min_interval=CHECKPOINT_INTERVAL)
+calibration_cache = CalibrationCache("calibration_cache.json")
+
+sensor_lock = threading.Lock()
+spectral = SpectralAnalyzer(sample_rate=1 / SAFETY_INTERVAL, resting=lambda: interlock.sampler.idle)
+interlock = SafetyInterlock(sensor, servo, sensor_lock, velocity_limit=MAX_VELOCITY_THRESHOLD, accel_limit=MAX_ACCEL_THRESHOLD,
+                            interval=SAFETY_INTERVAL, idle_interval=SAFETY_IDLE_INTERVAL, on_sample=spectral.push,
+                            on_trip=lambda v, a, latency: log.warn("🛑 SAFETY STOP! Velocity {:.2f}, accel {:.2f} ({:.2f} ms)", v, a, latency * 1000))
+gated_servo = GatedServo(servo, interlock)
 
 def collect_user_bicep_curl_range(sensor):
     print("📢 Perform a few bicep curls to determine range of motion.")
     time.sleep(2)
 
     collected_y_angles = []
+    peak_velocity = 0
     for _ in range(10):
-        angles = sensor.euler_angles()
+        with sensor_lock:
+            angles = sensor.euler_angles()
         if angles is not None and len(angles) >= 3:
             collected_y_angles.append(angles[1])
-        time.sleep(0.5)
+
+        # Poll the gyro at full rate between angle readings so the peak speed isn't missed.
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            with sensor_lock:
+                angular_velocity = sensor.gyroscope()
+            if angular_velocity is not None:
+                peak_velocity = max(peak_velocity, abs(angular_velocity[1]))
+            time.sleep(SAFETY_INTERVAL)
 
     if len(collected_y_angles) < 5:
         print("⚠️ Calibration failed: Not enough movement data detected. Try again.")
-        return None, None  
+        return None, None, None  
 
-    return min(collected_y_angles), max(collected_y_angles)
-
-def adjust_servo_resistance(y_avg, angular_velocity, min_flexion, max_flexion, servo):
-    if min_flexion is None or max_flexion is None:
-        print("⚠️ Error: Flexion range not set. Skipping resistance adjustment.")
-        return 0  
+    if peak_velocity < REP_START_VELOCITY:
+        # No real rep was seen, so there is nothing to personalise the limit from.
+        velocity_limit = MAX_VELOCITY_THRESHOLD
+    else:
+        velocity_limit = max(MIN_VELOCITY_THRESHOLD, min(MAX_VELOCITY_THRESHOLD, peak_velocity * VELOCITY_MARGIN))
+    return min(collected_y_angles), max(collected_y_angles), velocity_limit
 
-    if abs(angular_velocity) > MAX_VELOCITY_THRESHOLD:
-        print("⚠️ TOO FAST! Restricting movement.")
-        servo.mid()  
+def adjust_servo_resistance(y_avg, angular_velocity, min_flexion, max_flexion, servo, velocity_limit=MAX_VELOCITY_THRESHOLD):
+    resistance, command = compute_resistance(y_avg, angular_velocity, min_flexion, max_flexion, velocity_limit)
+    if command is None:
+        log.warn("⚠️ Error: Flexion range not set. Skipping resistance adjustment.")
         return 0  
 
-    resistance = (y_avg - min_flexion) / (max_flexion - min_flexion)
-    resistance = max(0, min(1, resistance))  
-
-    if resistance < 0.3:
-        servo.min()
-    elif resistance > 0.7:
-        servo.max()
-    else:
-        servo.mid()
+    if abs(angular_velocity) > velocity_limit:
+        log.warn("⚠️ TOO FAST! Restricting movement.", velocity=angular_velocity)
 
+    getattr(servo, command)()
     return resistance
 
 def update_graph(time_stamps, y_angle_values, servo_positions, angular_velocity_values, acceleration_values):
@@ -73,7 +100,7 @@ def update_graph(time_stamps, y_angle_values, servo_positions, angular_velocity_
 
     canvas.draw()
 
-def tracking_loop(min_flexion, max_flexion, sensor, servo):
+def tracking_loop(min_flexion, max_flexion, sensor, servo, resume=None, velocity_limit=MAX_VELOCITY_THRESHOLD):
     time_stamps = []
     y_angle_values = []
     servo_positions = []
@@ -83,17 +110,42 @@ def tracking_loop(min_flexion, max_flexion, sensor, servo):
     rep_count = 0
     start_time = time.time()
     rep_in_progress = False
-
-    print("\nY-Angle (raw)\tY-Angle (avg)\tSlope\tMotor")
+    sampler = AdaptiveSampler(SAMPLE_INTERVAL, IDLE_SAMPLE_INTERVAL)
+
+    interlock.velocity_limit = velocity_limit
+    interlock.start()
+    spectral.start()
+
+    if resume is not None:
+        rep_count = resume["rep_count"]
+        rep_in_progress = resume["rep_in_progress"]
+        data_buffer_y = list(resume["filter_buffer"])
+        start_time -= resume["elapsed"]
+        sampler.still_count = resume["still_count"]
+        sampler.idle = resume["idle"]
+        servo.value = resume["servo_value"]
+        log.info("♻️ Resumed session at rep {}.", rep_count)
+
+    log.event("session_start", min_flexion=min_flexion, max_flexion=max_flexion, velocity_limit=velocity_limit,
+              resumed=resume is not None)
+    # Log the restored filter values so offline replay starts from the same buffer.
+    for value in data_buffer_y:
+        log.event("sample", elapsed=time.time() - start_time, rep=rep_count, raw_y=value, restored=True)
+
+    log.info("\nY-Angle (raw)\tY-Angle (avg)\tSlope\tMotor")
     
     while True:
-        angles = sensor.euler_angles()
-        angular_velocity = sensor.gyroscope()
-        linear_accel = sensor.lin_acceleration()
+        read_started = time.perf_counter()
+        with sensor_lock:
+            angles = sensor.euler_angles()
+            angular_velocity = sensor.gyroscope()
+            linear_accel = sensor.lin_acceleration()
 
         if angles is None or len(angles) < 3 or angular_velocity is None or linear_accel is None:
             continue  
 
+        interlock.check(angular_velocity, linear_accel, read_started)
+
         raw_y = angles[1]
         raw_x = angles[0]
 
@@ -106,28 +158,36 @@ def tracking_loop(min_flexion, max_flexion, sensor, servo):
 
         y_avg = rolling_average(data_buffer_y)
         if y_avg is None:
+            log.event("sample", elapsed=time.time() - start_time, rep=rep_count, raw_x=raw_x, raw_y=raw_y,
+                      gyro_y=angular_velocity[1], accel_y=linear_accel[1])
             continue  
 
         slope = 0 if len(data_buffer_y) < 2 else data_buffer_y[-1] - data_buffer_y[-2]
 
-        resistance = adjust_servo_resistance(y_avg, angular_velocity[1], min_flexion, max_flexion, servo)
+        if user_info.get("name") and calibration_cache.observe(user_info, EXERCISE, raw_y):
+            log.warn("⚠️ Range of motion has drifted from the saved calibration; recalibrate next session.")
 
-        motor_state = "Rotating" if abs(slope) > 5 else "Off"
-        if slope > 5.0:
-            servo.max()
-        elif slope < -5.0:
-            servo.min()
+        if interlock.alive:
+            resistance = adjust_servo_resistance(y_avg, angular_velocity[1], min_flexion, max_flexion, servo, velocity_limit)
+            motor_state = "Rotating" if abs(slope) > SLOPE_THRESHOLD else "Off"
+            getattr(servo, slope_command(slope))()
         else:
-            servo.mid()
-
-        if angular_velocity[1] > 0.5 and not rep_in_progress:  
-            rep_in_progress = True
-        elif angular_velocity[1] < 0.1 and rep_in_progress:
+            log.warn("🛑 Safety interlock has lost the sensor; servo held parked.", read_errors=interlock.read_errors)
+            resistance, motor_state = 0, "Parked"
+
+        was_in_progress = rep_in_progress
+        rep_in_progress, rep_completed = update_rep_state(angular_velocity[1], rep_in_progress)
+        if rep_in_progress and not was_in_progress:
+            spectral.start_rep()
+        if rep_completed:
             rep_count += 1
-            print(f"✅ Rep {rep_count} Completed!")
-            rep_in_progress = False  
+            quality = spectral.end_rep()
+            log.info("✅ Rep {} Completed! Tremor: {} | Smoothness (LDLJ): {}", rep_count, quality["tremor_ratio"], quality["ldlj"])
+            log.event("rep_quality", rep=rep_count, **quality)
 
         elapsed_time = round(time.time() - start_time, 1)
+        log.event("sample", elapsed=time.time() - start_time, rep=rep_count, raw_x=raw_x, raw_y=raw_y, y_avg=y_avg,
+                  slope=slope, gyro_y=angular_velocity[1], accel_y=linear_accel[1], resistance=resistance)
         time_stamps.append(elapsed_time)
         y_angle_values.append(y_avg)
         servo_positions.append(resistance)
@@ -141,20 +201,54 @@ def tracking_loop(min_flexion, max_flexion, sensor, servo):
             angular_velocity_values.pop(0)
             acceleration_values.pop(0)
 
-        print(f"{raw_y:.1f}\t{y_avg:.1f}\t{slope:.1f}\t{motor_state}")
+        log.info("{:.1f}\t{:.1f}\t{:.1f}\t{}", raw_y, y_avg, slope, motor_state)
 
         root.after(0, lambda: update_graph(time_stamps, y_angle_values, servo_positions, angular_velocity_values, acceleration_values))
-        root.after(0, lambda: posture_status.set(f"📏 Y: {y_avg:.2f}° | 🎛️ Servo: {resistance:.2f} | 🔄 Reps: {rep_count}"))
-
-        time.sleep(0.5)
-
-def start_tracking(sensor, servo):
-    min_flexion, max_flexion = collect_user_bicep_curl_range(sensor)
-    if min_flexion is None or max_flexion is None:
-        print("⚠️ Cannot start tracking. Calibration failed.")
-        return  
-
-    threading.Thread(target=tracking_loop, args=(min_flexion, max_flexion, sensor, servo), daemon=True).start()
+        safety = interlock.metrics()
+        root.after(0, lambda: posture_status.set(f"📏 Y: {y_avg:.2f}° | 🎛️ Servo: {resistance:.2f} | 🔄 Reps: {rep_count} | 🛡️ {safety['worst_response_ms']:.1f} ms"))
+
+        was_idle = sampler.idle
+        interval = sampler.update(angular_velocity)
+        if sampler.idle != was_idle:
+            log.info("💤 Arm at rest, slowing sampling." if sampler.idle else "🏃 Motion detected, full-rate sampling.")
+
+        saved = checkpointer.maybe_save({
+            "min_flexion": min_flexion,
+            "max_flexion": max_flexion,
+            "velocity_limit": velocity_limit,
+            "elapsed": time.time() - start_time,
+            "rep_count": rep_count,
+            "rep_in_progress": rep_in_progress,
+            "servo_value": servo.value,
+            "still_count": sampler.still_count,
+            "idle": sampler.idle,
+            "filter_buffer": data_buffer_y[-ROLLING_WINDOW:],
+            "user_info": user_info,
+        })
+        if saved:
+            log.event("safety", **safety)
+
+        time.sleep(interval)
+
+def start_tracking(sensor, servo, recalibrate=False):
+    name = user_info.get("name", "")
+    if name and recalibrate:
+        calibration_cache.invalidate(user_info, EXERCISE)
+    cached = calibration_cache.get(user_info, EXERCISE) if name else None
+
+    if cached is not None:
+        print(f"✅ Using saved calibration for {name}. Range: {cached['min_flexion']:.2f}° to {cached['max_flexion']:.2f}°")
+        min_flexion, max_flexion, velocity_limit = cached["min_flexion"], cached["max_flexion"], cached["velocity_limit"]
+    else:
+        min_flexion, max_flexion, velocity_limit = collect_user_bicep_curl_range(sensor)
+        if min_flexion is None or max_flexion is None:
+            print("⚠️ Cannot start tracking. Calibration failed.")
+            return  
+        if name:
+            calibration_cache.put(user_info, EXERCISE, min_flexion, max_flexion, velocity_limit)
+
+    threading.Thread(target=tracking_loop, args=(min_flexion, max_flexion, sensor, servo),
+                     kwargs={"velocity_limit": velocity_limit}, daemon=True).start()
     root.after(0, lambda: posture_status.set("✅ Tracking Started!"))
 
 def save_user_info():
@@ -166,10 +260,16 @@ def save_user_info():
     user_frame.pack_forget()
     tracking_frame.pack()
 
+def end_session():
+    # Closing the window is a deliberate end, so the next launch must not resume this user.
+    checkpointer.clear()
+    root.destroy()
+
 user_info = {}
 
 root = tk.Tk()
 root.title("Smart Rehab Band UI")
+root.protocol("WM_DELETE_WINDOW", end_session)
 root.geometry("800x700")
 root.config(bg="#282c34")
 
@@ -201,7 +301,9 @@ tk.Button(user_frame, text="Submit & Continue", command=save_user_info).pack(pad
 
 tracking_frame = tk.Frame(root, bg="#282c34")
 
-tk.Button(tracking_frame, text="📝 Perform Calibration (Do 10 Reps)", command=lambda: start_tracking(sensor, servo)).pack(pady=5)
+tk.Button(tracking_frame, text="▶️ Start (Saved Calibration)", command=lambda: start_tracking(sensor, gated_servo)).pack(pady=5)
+tk.Button(tracking_frame, text="📝 Perform Calibration (Do 10 Reps)",
+          command=lambda: start_tracking(sensor, gated_servo, recalibrate=True)).pack(pady=5)
 status_label = tk.Label(tracking_frame, textvariable=posture_status, font=("Arial", 14), fg="white", bg="#282c34")
 status_label.pack(pady=5)
 
@@ -209,4 +311,13 @@ fig, ax = plt.subplots(figsize=(5, 3), dpi=100)
 canvas = FigureCanvasTkAgg(fig, master=tracking_frame)
 canvas.get_tk_widget().pack()
 
+resumed = checkpointer.load()
+if resumed is not None:
+    user_info.update(resumed["user_info"])
+    user_frame.pack_forget()
+    tracking_frame.pack()
+    threading.Thread(target=tracking_loop, args=(resumed["min_flexion"], resumed["max_flexion"], sensor, gated_servo, resumed),
+                     kwargs={"velocity_limit": resumed["velocity_limit"]}, daemon=True).start()
+    posture_status.set("♻️ Session Resumed!")
+
 root.mainloop()
@@ -0,0 +1,185 @@
+import math
+import os
+import threading
+import time
+
+from adaptive_sampling import AdaptiveSampler
+
+
+class SafetyInterlock:
+    """
+    Over-speed interlock that runs on its own thread, independent of the UI and tracking loop.
+    Every raw gyro/accel sample it reads is checked against the velocity and acceleration
+    limits; on a violation the servo is parked at mid and the interlock stays tripped for
+    hold_time seconds, during which GatedServo drops every other command. The time from the
+    start of the sensor read to the servo being parked is recorded as the response latency.
+
+    To save CPU, I2C traffic and battery the interlock backs off to idle_interval after
+    rest_samples consecutive still gyro readings, and returns to interval on the first
+    reading above rest_threshold. While backed off a violation can go unseen for up to
+    idle_interval; worst_sample_gap reports the gap actually observed, and worst_response
+    (gap + latency) bounds the time from a violation happening to the servo being parked.
+
+    A failed or empty sensor read is counted rather than raised. After max_read_errors of
+    them in a row the servo is parked and alive turns False until reads succeed again;
+    GatedServo refuses every command while the interlock is not alive.
+    """
+
+    def __init__(self, sensor, servo, sensor_lock, velocity_limit=2.5, accel_limit=15.0,
+                 interval=0.005, hold_time=0.5, on_trip=None, on_sample=None,
+                 idle_interval=0.05, rest_threshold=0.1, rest_samples=200, max_read_errors=10):
+        self.sensor = sensor
+        self.servo = servo
+        self.sensor_lock = sensor_lock
+        self.velocity_limit = velocity_limit
+        self.accel_limit = accel_limit
+        self.interval = interval
+        self.hold_time = hold_time
+        self.on_trip = on_trip
+        self.on_sample = on_sample
+        self.max_read_errors = max_read_errors
+        self.sampler = AdaptiveSampler(interval, idle_interval, rest_threshold, rest_samples)
+
+        self.command_lock = threading.Lock()
+        self.tripped_until = 0.0
+        self.trip_count = 0
+        self.samples = 0
+        self.last_latency = 0.0
+        self.worst_latency = 0.0
+        self.worst_sample_gap = 0.0
+        self.read_errors = 0
+        self.failed_reads = 0  # consecutive
+
+        self._thread = None
+
+    @property
+    def tripped(self):
+        return time.monotonic() < self.tripped_until
+
+    @property
+    def alive(self):
+        """True while the interlock thread is running and getting sensor readings."""
+        return (self._thread is not None and self._thread.is_alive()
+                and self.failed_reads < self.max_read_errors)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="safety-interlock", daemon=True)
+        self._thread.start()
+
+    def check(self, angular_velocity, linear_accel, read_started):
+        """Evaluates one raw sample; trips the interlock if it breaks a limit. Returns True on a trip."""
+        velocity = abs(angular_velocity[1])
+        accel = math.sqrt(sum(a * a for a in linear_accel)) if linear_accel is not None else 0.0
+        if velocity <= self.velocity_limit and accel <= self.accel_limit:
+            return False
+
+        with self.command_lock:
+            self.servo.mid()
+            self.tripped_until = time.monotonic() + self.hold_time
+        latency = time.perf_counter() - read_started
+
+        self.trip_count += 1
+        self.last_latency = latency
+        self.worst_latency = max(self.worst_latency, latency)
+        if self.on_trip is not None:
+            self.on_trip(velocity, accel, latency)
+        return True
+
+    def metrics(self):
+        """Snapshot of interlock health; latencies are in milliseconds."""
+        return {
+            "alive": self.alive,
+            "samples": self.samples,
+            "read_errors": self.read_errors,
+            "trips": self.trip_count,
+            "tripped": self.tripped,
+            "idle": self.sampler.idle,
+            "last_latency_ms": round(self.last_latency * 1000, 3),
+            "worst_latency_ms": round(self.worst_latency * 1000, 3),
+            "worst_sample_gap_ms": round(self.worst_sample_gap * 1000, 3),
+            # A violation can start just after a read, so it waits up to one gap before being seen.
+            "worst_response_ms": round((self.worst_sample_gap + self.worst_latency) * 1000, 3),
+        }
+
+    def _park(self):
+        with self.command_lock:
+            self.servo.mid()
+
+    def _run(self):
+        _raise_thread_priority()
+
+        previous_read = None
+        try:
+            while True:
+                read_started = time.perf_counter()
+                # The gap between reads bounds how long a violation can go unseen.
+                if previous_read is not None:
+                    self.worst_sample_gap = max(self.worst_sample_gap, read_started - previous_read)
+                previous_read = read_started
+
+                try:
+                    with self.sensor_lock:
+                        angular_velocity = self.sensor.gyroscope()
+                        linear_accel = self.sensor.lin_acceleration()
+                except OSError:
+                    # I2C errors (e.g. a loose cable) are transient often enough to keep retrying.
+                    angular_velocity = None
+
+                if angular_velocity is None:
+                    self.read_errors += 1
+                    self.failed_reads += 1
+                    if self.failed_reads == self.max_read_errors:
+                        self._park()
+                    time.sleep(self.interval)
+                    continue
+
+                self.failed_reads = 0
+                self.samples += 1
+                self.check(angular_velocity, linear_accel, read_started)
+                # Downstream consumers only see the sample after the limits have been checked.
+                if self.on_sample is not None:
+                    self.on_sample(angular_velocity, linear_accel)
+                time.sleep(self.sampler.update(angular_velocity))
+        finally:
+            # Nothing is watching the arm any more, so leave the servo parked.
+            self._park()
+
+
+class GatedServo:
+    """Servo wrapper that ignores every command while the safety interlock is tripped or not alive."""
+
+    def __init__(self, servo, interlock):
+        self.servo = servo
+        self.interlock = interlock
+
+    def min(self):
+        self._command(self.servo.min)
+
+    def mid(self):
+        self._command(self.servo.mid)
+
+    def max(self):
+        self._command(self.servo.max)
+
+    @property
+    def value(self):
+        return self.servo.value
+
+    @value.setter
+    def value(self, value):
+        self._command(lambda: setattr(self.servo, "value", value))
+
+    def _command(self, action):
+        with self.interlock.command_lock:
+            if self.interlock.alive and not self.interlock.tripped:
+                action()
+
+
+def _raise_thread_priority():
+    """Best effort: run the calling thread under SCHED_FIFO (needs root on the Pi)."""
+    try:
+        os.sched_setscheduler(threading.get_native_id(), os.SCHED_FIFO, os.sched_param(50))
+    except (AttributeError, OSError):
+        pass
@@ -1,7 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 import time 
 
 from sensor_library import *
 
+from event_log import EventLogger
+
 from gpiozero import Servo
 from gpiozero import LED
 
@@ -9,6 +16,7 @@ red_led = LED(6)
 
 sensor = Orientation_Sensor()
 servo = Servo(8)
+log = EventLogger()
 
 
 def main():
@@ -27,18 +35,18 @@ def main():
         check_limit_z = within_limit_z(avg[2], 0, 120)
 
         if check_limit_x == False or check_limit_z == False:
-            print("ITS OFFFFFFFFFF FOR X AND Y")
+            log.warn("ITS OFFFFFFFFFF FOR X AND Y")
             red_led.on()
         else:
             red_led.off()
 
         if check_limit_y == 0:
-            print("goooooooooooood")
+            log.info("goooooooooooood")
         elif check_limit_y == 1:
-            print("UNDEEERRRRR")
+            log.warn("UNDEEERRRRR")
             servo.max()
         elif check_limit_y == 2:
-            print("OVVEEERR")
+            log.warn("OVVEEERR")
             servo.min()
 
         
@@ -82,7 +90,7 @@ def rolling_average():
         z_avg = 60 + z_avg
         
     angles = [x_avg, y_avg, z_avg]
-    print("ROLLING AVERAGE: ", x_avg, y_avg, z_avg)
+    log.info("ROLLING AVERAGE:  {} {} {}", x_avg, y_avg, z_avg)
     return angles
 
 
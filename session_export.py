@@ -0,0 +1,111 @@
+import sys
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from event_log import SESSION_FIELDS, iter_samples
+
+# Columns written for every "sample" event logged by main.tracking_loop.
+FLOAT_COLUMNS = ["raw_x", "raw_y", "y_avg", "slope", "gyro_y", "accel_y", "resistance"]
+
+# Per-session values from the "session_start" event, repeated on every row of that session.
+SESSION_COLUMNS = list(SESSION_FIELDS)
+
+SCHEMA = pa.schema(
+    [("session", pa.int64()), ("t_ms", pa.int64()), ("rep", pa.int32())]
+    + [(name, pa.float32()) for name in FLOAT_COLUMNS]
+    + [("min_flexion", pa.float64()), ("max_flexion", pa.float64()), ("velocity_limit", pa.float64()),
+       ("resumed", pa.bool_())]
+    # True for filter-buffer values restored from a checkpoint rather than read live.
+    + [("restored", pa.bool_())]
+)
+
+# Timestamps and rep counters grow monotonically, so delta packing shrinks them to a few
+# bits per row; byte-stream-split groups the float exponents so zstd compresses IMU series well.
+COLUMN_ENCODING = {"session": "DELTA_BINARY_PACKED", "t_ms": "DELTA_BINARY_PACKED", "rep": "DELTA_BINARY_PACKED"}
+COLUMN_ENCODING.update({name: "BYTE_STREAM_SPLIT" for name in FLOAT_COLUMNS})
+# Session columns are constant within a session, so dictionary + RLE stores them almost for free.
+DICTIONARY_COLUMNS = SESSION_COLUMNS + ["restored"]
+
+
+def iter_batches(jsonl_path, chunk_rows=8192):
+    """Converts the event log into Arrow record batches of at most chunk_rows rows."""
+    columns = {name: [] for name in SCHEMA.names}
+
+    for session, start, sample in iter_samples(jsonl_path):
+        columns["session"].append(session)
+        columns["t_ms"].append(int(round(sample["elapsed"] * 1000)))
+        columns["rep"].append(sample["rep"])
+        for name in FLOAT_COLUMNS:
+            columns[name].append(sample.get(name))
+        for name in SESSION_COLUMNS:
+            columns[name].append(start[name])
+        columns["restored"].append(sample.get("restored", False))
+
+        if len(columns["t_ms"]) >= chunk_rows:
+            yield pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+            columns = {name: [] for name in SCHEMA.names}
+
+    if columns["t_ms"]:
+        yield pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+
+
+def export_session(jsonl_path, out_path, fmt="parquet", chunk_rows=8192, compression="zstd"):
+    """
+    Streams an event log into a compressed columnar file without loading it all in memory.
+    Each chunk becomes its own Parquet row group, so min/max statistics let readers skip
+    whole chunks when filtering by time or rep. Returns the number of rows written.
+    """
+    rows = 0
+
+    if fmt == "parquet":
+        with pq.ParquetWriter(out_path, SCHEMA, compression=compression, use_dictionary=DICTIONARY_COLUMNS,
+                              column_encoding=COLUMN_ENCODING) as writer:
+            for batch in iter_batches(jsonl_path, chunk_rows):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    elif fmt == "arrow":
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.OSFile(out_path, "wb") as sink, pa.ipc.new_file(sink, SCHEMA, options=options) as writer:
+            for batch in iter_batches(jsonl_path, chunk_rows):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    return rows
+
+
+def load_session(path, columns=None, time_range=None, rep_range=None, session=None):
+    """
+    Loads an exported Parquet or Arrow file, returning only the requested columns.
+    time_range is (start_s, end_s) and rep_range is (first_rep, last_rep), both inclusive.
+    The filters are pushed down to the reader: Parquet skips row groups whose statistics
+    rule them out, and both formats decode only the requested columns.
+    """
+    filters = []
+    if session is not None:
+        filters.append(("session", "=", session))
+    if time_range is not None:
+        filters.append(("t_ms", ">=", int(time_range[0] * 1000)))
+        filters.append(("t_ms", "<=", int(time_range[1] * 1000)))
+    if rep_range is not None:
+        filters.append(("rep", ">=", rep_range[0]))
+        filters.append(("rep", "<=", rep_range[1]))
+
+    if path.endswith((".arrow", ".feather")):
+        expression = pq.filters_to_expression(filters) if filters else None
+        return ds.dataset(path, format="ipc").to_table(columns=columns, filter=expression)
+
+    return pq.read_table(path, columns=columns, filters=filters or None)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python session_export.py <session_log.jsonl> <output.parquet|output.arrow>")
+        sys.exit(1)
+
+    out = sys.argv[2]
+    written = export_session(sys.argv[1], out, fmt="arrow" if out.endswith((".arrow", ".feather")) else "parquet")
+    print(f"✅ Exported {written} samples to {out}")
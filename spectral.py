@@ -0,0 +1,269 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+CHANNELS = ("gyro_x", "gyro_y", "gyro_z", "accel_x", "accel_y", "accel_z")
+GYRO_Y = 1
+
+
+class SpectralAnalyzer:
+    """
+    Streaming tremor and smoothness analysis over the raw gyro and linear-acceleration stream.
+    push() only copies one sample into a preallocated ring buffer and updates a few running
+    jerk sums, so it is safe to call from the 200 Hz safety thread. Every hop samples a
+    background thread runs a Hann-windowed FFT over the last window_size samples of every
+    channel, reusing the same frame, spectrum and power buffers each time.
+
+    push() takes no lock: it is the only writer of the ring, and the ring holds two windows,
+    so the FFT thread can copy the finished window while new samples land in the other half.
+    Per-rep sums live in a dict that start_rep/end_rep swap out in one assignment.
+
+    Windows must hold evenly spaced samples. Short stalls (the safety thread waiting on the
+    sensor lock or the GIL) are bridged by repeating the last sample for each missed period.
+    The window is only emptied when resting() reports the arm at rest (the safety interlock
+    has backed off) or a gap outlasts a whole hop, so no tremor windows are produced at rest
+    and analysis restarts one full window after motion resumes.
+
+    Jerk is taken from velocity and acceleration that have first been through two cascaded
+    one-pole low-passes at smoothing_cutoff Hz; differentiating the raw 200 Hz signal would
+    mostly measure IMU noise.
+    """
+
+    def __init__(self, sample_rate=200.0, window_size=256, hop=128, tremor_band=(4.0, 12.0),
+                 smoothing_cutoff=10.0, resting=None):
+        self.sample_rate = sample_rate
+        self.window_size = window_size
+        self.hop = hop
+        self.tremor_band = tremor_band
+        self.resting = resting
+        self._alpha = 1 - math.exp(-2 * math.pi * smoothing_cutoff / sample_rate)
+
+        channels = len(CHANNELS)
+        self._ring_size = 2 * window_size
+        self._ring = np.zeros((channels, self._ring_size))
+        self._frame = np.zeros((channels, window_size))
+        self._means = np.zeros((channels, 1))
+        self._window = np.hanning(window_size)
+        self._spectrum = np.zeros((channels, window_size // 2 + 1), dtype=complex)
+        self._power = np.zeros((channels, window_size // 2 + 1))
+        self._band_power = np.zeros(channels)
+        self._total_power = np.zeros(channels)
+        self._rfft_out = _rfft_supports_out()
+
+        # Producer (push) state.
+        self._written = 0
+        self._filled = 0
+        self._since_hop = 0
+        self._last_push = None
+        self._last_hop_push = None
+        self._velocity_stage = None
+        self._velocity = None
+        self._prev_velocity = None
+        self._prev_prev_velocity = None
+        self._ax1 = self._ay1 = self._az1 = None
+        self._ax = self._ay = self._az = None
+        self._prev_ax = self._prev_ay = self._prev_az = None
+
+        # Handed from push to the FFT thread.
+        self._frame_end = 0
+        self._ready = threading.Event()
+        self._thread = None
+
+        self.tremor_power = 0.0
+        self.tremor_ratio = 0.0
+        self.windows = 0
+        self._rep = _new_rep()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="spectral", daemon=True)
+        self._thread.start()
+
+    def push(self, angular_velocity, linear_accel):
+        """Adds one raw (gyro, linear accel) sample. Does no allocation, no locking and no FFT work."""
+        if angular_velocity is None or linear_accel is None:
+            return
+
+        now = time.perf_counter()
+        if self._last_push is not None:
+            gap = now - self._last_push
+            if gap * self.sample_rate > self.hop or (self.resting is not None and self.resting()):
+                self._restart_window()
+            else:
+                self._bridge(round(gap * self.sample_rate) - 1)
+        self._last_push = now
+
+        ring = self._ring
+        i = self._written % self._ring_size
+        ring[0, i], ring[1, i], ring[2, i] = angular_velocity[0], angular_velocity[1], angular_velocity[2]
+        ring[3, i], ring[4, i], ring[5, i] = linear_accel[0], linear_accel[1], linear_accel[2]
+        self._written += 1
+        self._filled += 1
+        self._accumulate_jerk(angular_velocity[GYRO_Y], linear_accel)
+
+        self._since_hop += 1
+        if self._since_hop >= self.hop and self._filled >= self.window_size:
+            # The loop's real rate sits a little under nominal, so bin mapping uses the measured rate.
+            if self._last_hop_push is not None:
+                self.sample_rate = self._since_hop / (now - self._last_hop_push)
+            self._last_hop_push = now
+            self._since_hop = 0
+            self._frame_end = self._written
+            self._ready.set()
+
+    def start_rep(self):
+        self._rep = _new_rep()
+
+    def end_rep(self):
+        """
+        Returns tremor and smoothness metrics for the rep since the last start_rep/end_rep and resets them.
+        ldlj is the log dimensionless jerk of the y-axis angular velocity (closer to zero is smoother);
+        rms_jerk is the RMS linear jerk in m/s^3.
+        """
+        rep, self._rep = self._rep, _new_rep()
+
+        duration = rep["samples"] / self.sample_rate
+        ldlj = None
+        if rep["samples"] > 2 and rep["peak_velocity"] > 0:
+            dimensionless = duration ** 3 / rep["peak_velocity"] ** 2 * rep["angular_jerk_sq"] / self.sample_rate
+            ldlj = -math.log(dimensionless) if dimensionless > 0 else None
+
+        return {
+            "duration": round(duration, 2),
+            "tremor_ratio": round(rep["tremor_ratio_sum"] / rep["windows"], 4) if rep["windows"] else None,
+            "peak_tremor_power": round(rep["peak_tremor_power"], 4),
+            "ldlj": round(ldlj, 3) if ldlj is not None else None,
+            "rms_jerk": round(math.sqrt(rep["linear_jerk_sq"] / rep["samples"]), 3) if rep["samples"] else None,
+        }
+
+    def _bridge(self, missing):
+        """Fills missed sample periods with copies of the last sample so the window stays evenly spaced."""
+        if missing <= 0 or self._written == 0:
+            return
+        ring = self._ring
+        last = (self._written - 1) % self._ring_size
+        velocity = ring[GYRO_Y, last]
+        linear_accel = (ring[3, last], ring[4, last], ring[5, last])
+        for _ in range(missing):
+            ring[:, self._written % self._ring_size] = ring[:, last]
+            self._written += 1
+            self._filled += 1
+            self._since_hop += 1
+            self._accumulate_jerk(velocity, linear_accel)
+
+    def _restart_window(self):
+        self._filled = 0
+        self._since_hop = 0
+        self._last_hop_push = None
+        self._velocity_stage = self._velocity = self._prev_velocity = self._prev_prev_velocity = None
+        self._ax1 = self._ay1 = self._az1 = None
+        self._ax = self._ay = self._az = None
+        self._prev_ax = self._prev_ay = self._prev_az = None
+
+    def _accumulate_jerk(self, velocity, linear_accel):
+        rep = self._rep
+        fs = self.sample_rate
+        alpha = self._alpha
+        rep["samples"] += 1
+
+        if self._velocity is None:
+            self._velocity_stage = self._velocity = velocity
+            self._ax1 = self._ax = linear_accel[0]
+            self._ay1 = self._ay = linear_accel[1]
+            self._az1 = self._az = linear_accel[2]
+        else:
+            self._velocity_stage += alpha * (velocity - self._velocity_stage)
+            self._velocity += alpha * (self._velocity_stage - self._velocity)
+            self._ax1 += alpha * (linear_accel[0] - self._ax1)
+            self._ay1 += alpha * (linear_accel[1] - self._ay1)
+            self._az1 += alpha * (linear_accel[2] - self._az1)
+            self._ax += alpha * (self._ax1 - self._ax)
+            self._ay += alpha * (self._ay1 - self._ay)
+            self._az += alpha * (self._az1 - self._az)
+
+        v = self._velocity
+        rep["peak_velocity"] = max(rep["peak_velocity"], abs(v))
+        if self._prev_prev_velocity is not None:
+            second_diff = (v - 2 * self._prev_velocity + self._prev_prev_velocity) * fs * fs
+            rep["angular_jerk_sq"] += second_diff * second_diff
+        self._prev_prev_velocity, self._prev_velocity = self._prev_velocity, v
+
+        if self._prev_ax is not None:
+            jx = (self._ax - self._prev_ax) * fs
+            jy = (self._ay - self._prev_ay) * fs
+            jz = (self._az - self._prev_az) * fs
+            rep["linear_jerk_sq"] += jx * jx + jy * jy + jz * jz
+        self._prev_ax, self._prev_ay, self._prev_az = self._ax, self._ay, self._az
+
+    def _run(self):
+        n = self.window_size
+        size = self._ring_size
+        frame = self._frame
+        ring = self._ring
+
+        while True:
+            self._ready.wait()
+            self._ready.clear()
+
+            end = self._frame_end
+            start = (end - n) % size
+            if start + n <= size:
+                frame[:] = ring[:, start:start + n]
+            else:
+                split = size - start
+                frame[:, :split] = ring[:, start:]
+                frame[:, split:] = ring[:, :n - split]
+            # push() only overwrites this window after another full window of samples; skip it if that happened.
+            if self._written - end > size - n:
+                continue
+
+            np.mean(frame, axis=1, out=self._means[:, 0])
+            np.subtract(frame, self._means, out=frame)
+            np.multiply(frame, self._window, out=frame)
+            if self._rfft_out:
+                np.fft.rfft(frame, axis=1, out=self._spectrum)
+            else:
+                self._spectrum[...] = np.fft.rfft(frame, axis=1)
+            np.abs(self._spectrum, out=self._power)
+            np.square(self._power, out=self._power)
+
+            lo = max(1, math.ceil(self.tremor_band[0] * n / self.sample_rate))
+            hi = min(self._power.shape[1], math.floor(self.tremor_band[1] * n / self.sample_rate) + 1)
+            np.sum(self._power[:, lo:hi], axis=1, out=self._band_power)
+            np.sum(self._power[:, 1:], axis=1, out=self._total_power)
+
+            # Tremor is reported from the gyro channels; voluntary curls sit well below the band.
+            band = float(self._band_power[:3].sum())
+            total = float(self._total_power[:3].sum())
+            self.tremor_power = band / (n * n)
+            self.tremor_ratio = band / total if total > 0 else 0.0
+            self.windows += 1
+
+            rep = self._rep
+            rep["windows"] += 1
+            rep["tremor_ratio_sum"] += self.tremor_ratio
+            rep["peak_tremor_power"] = max(rep["peak_tremor_power"], self.tremor_power)
+
+
+def _new_rep():
+    return {
+        "samples": 0,
+        "windows": 0,
+        "tremor_ratio_sum": 0.0,
+        "peak_tremor_power": 0.0,
+        "peak_velocity": 0.0,
+        "angular_jerk_sq": 0.0,
+        "linear_jerk_sq": 0.0,
+    }
+
+
+def _rfft_supports_out():
+    """numpy.fft.rfft only accepts out= from numpy 2.0; older versions fall back to a copy."""
+    try:
+        np.fft.rfft(np.zeros(4), out=np.zeros(3, dtype=complex))
+        return True
+    except TypeError:
+        return False
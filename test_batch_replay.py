@@ -0,0 +1,96 @@
+import math
+
+from batch_replay import DEFAULT_PARAMS, load_sessions, replay_file, run_batch
+from control import compute_resistance, rolling_average, slope_command, update_rep_state
+from event_log import EventLogger
+
+VELOCITY_LIMIT = 1.2  # personalised limit, well under the 2.5 default
+
+
+def record_live_session(path, restored=(), max_bytes=None):
+    """
+    Logs a synthetic session the way main.tracking_loop does and returns the decisions it made live.
+    The gyro peaks above VELOCITY_LIMIT but below the 2.5 default, so replaying with the wrong
+    limit changes the resistance.
+    """
+    log = EventLogger(jsonl_path=path, console=False, info_to_file=False, max_bytes=max_bytes,
+                      sticky_events=("session_start",))
+    min_flexion, max_flexion = -40.0, 60.0
+    log.event("session_start", min_flexion=min_flexion, max_flexion=max_flexion, velocity_limit=VELOCITY_LIMIT,
+              resumed=bool(restored))
+
+    data_buffer_y = list(restored)
+    for value in data_buffer_y:
+        log.event("sample", elapsed=0.0, rep=0, raw_y=value, restored=True)
+
+    rep_in_progress = False
+    rep_count = 0
+    resistances = []
+    commands = []
+    for i in range(400):
+        phase = 2 * math.pi * i / 40
+        raw_y = 10 + 50 * math.sin(phase) + 0.3 * math.sin(7.1 * i)
+        gyro_y = 2.0 * math.cos(phase)
+        data_buffer_y.append(raw_y)
+
+        y_avg = rolling_average(data_buffer_y)
+        if y_avg is None:
+            log.event("sample", elapsed=i * 0.05, rep=rep_count, raw_y=raw_y, gyro_y=gyro_y)
+            continue
+
+        slope = 0 if len(data_buffer_y) < 2 else data_buffer_y[-1] - data_buffer_y[-2]
+        resistance, _ = compute_resistance(y_avg, gyro_y, min_flexion, max_flexion, VELOCITY_LIMIT)
+        commands.append(slope_command(slope))
+        rep_in_progress, rep_completed = update_rep_state(gyro_y, rep_in_progress)
+        if rep_completed:
+            rep_count += 1
+        resistances.append(resistance)
+        log.event("sample", elapsed=i * 0.05, rep=rep_count, raw_y=raw_y, y_avg=y_avg, slope=slope,
+                  gyro_y=gyro_y, resistance=resistance)
+
+    log.close()
+    return {
+        "reps": rep_count,
+        "samples": len(resistances),
+        "mean_resistance": sum(resistances) / len(resistances),
+        "commands": {command: commands.count(command) for command in ("min", "mid", "max")},
+    }
+
+
+def test_replay_reproduces_live_decisions(tmp_path):
+    path = str(tmp_path / "session_log.jsonl")
+    live = record_live_session(path, restored=[5.0, 6.0, 7.0])
+
+    [[result]] = replay_file((path, [dict(DEFAULT_PARAMS)], {}))
+
+    assert result["reps"] == live["reps"] > 0
+    assert result["expected_reps"] == live["reps"]
+    assert result["samples"] == live["samples"]
+    assert result["mean_resistance"] == live["mean_resistance"]
+    assert result["commands"] == live["commands"]
+
+
+def test_replay_uses_logged_velocity_limit_unless_swept(tmp_path):
+    path = str(tmp_path / "session_log.jsonl")
+    live = record_live_session(path)
+
+    [[logged, default]] = replay_file((path, [dict(DEFAULT_PARAMS), dict(DEFAULT_PARAMS, velocity_limit=2.5)], {}))
+
+    assert logged["mean_resistance"] == live["mean_resistance"]
+    assert default["mean_resistance"] != live["mean_resistance"]
+    assert default["params"]["velocity_limit"] == 2.5
+
+
+def test_rotated_session_replays_as_one(tmp_path):
+    path = str(tmp_path / "session_log.jsonl")
+    live = record_live_session(path, max_bytes=8 * 1024)
+
+    assert (tmp_path / "session_log.jsonl.2").exists()
+    [session] = load_sessions(path).values()
+    assert len(session["raw_y"]) == 400
+    assert session["velocity_limit"] == VELOCITY_LIMIT
+
+    [summary] = run_batch([path, path + ".1"], workers=1)
+    assert summary["sessions"] == 1
+    assert summary["mean_rep_error"] == 0
+    assert summary["mean_resistance"] == live["mean_resistance"]